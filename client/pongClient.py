@@ -2,9 +2,12 @@ import pygame
 import socket
 import json
 import threading
+import time
 import sys
 
 class PongClient:
+    RESUME_GRACE = 10  # Seconds to keep trying to resume after losing the connection
+
     def __init__(self, host='localhost', port=5000):
         # Initialize Pygame
         pygame.init()
@@ -42,11 +45,16 @@ class PongClient:
         self.in_queue = False
         self.queue_position = 0
         self.game_id = None
+        self.resume_token = None
+        self.buffer = ''  # Unfinished line from the last recv
         
         # Network setup
+        self.host = host
+        self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.socket.connect((host, port))
+            self.socket.send((json.dumps({'type': 'hello'}) + '\n').encode())
             print("Connected to server")
         except ConnectionRefusedError:
             print("Could not connect to server")
@@ -71,9 +79,13 @@ class PongClient:
             try:
                 data = self.socket.recv(1024).decode()
                 if not data:
+                    if self._reconnect():
+                        continue
                     break
                     
-                messages = data.split('\n')
+                # Messages are newline delimited and may span or share reads
+                self.buffer += data
+                *messages, self.buffer = self.buffer.split('\n')
                 for message in messages:
                     if not message:
                         continue
@@ -84,11 +96,20 @@ class PongClient:
                         elif parsed['type'] == 'waiting':
                             self.in_queue = True
                             self.queue_position = parsed['position']
+                            # Only sent once the server has settled our hello,
+                            # so a token we still hold here is no longer valid
+                            self.resume_token = None
                             self.game_state['game_started'] = False
                         elif parsed['type'] == 'game_start':
                             self.in_queue = False
                             self.game_id = parsed['game_id']
+                            self.resume_token = parsed.get('resume_token')
                             self.game_state['game_started'] = True
+                        elif parsed['type'] == 'resumed':
+                            self.in_queue = False
+                            self.game_id = parsed['game_id']
+                            self.resume_token = parsed['resume_token']
+                            self.game_state = parsed['state']
                         elif parsed['type'] == 'error':
                             print("Server error:", parsed['message'])
                             self.running = False
@@ -96,11 +117,37 @@ class PongClient:
                     except json.JSONDecodeError:
                         print("Error parsing message:", message)
                         
-            except ConnectionResetError:
+            except (ConnectionResetError, OSError):
+                if self._reconnect():
+                    continue
                 print("Lost connection to server")
                 self.running = False
                 break
                 
+    def _reconnect(self):
+        """Reconnect and resume the current game, returns True on success"""
+        if not self.running or not self.resume_token:
+            return False
+            
+        print("Connection lost, trying to resume game...")
+        deadline = time.time() + self.RESUME_GRACE
+        while self.running and time.time() < deadline:
+            try:
+                new_socket = socket.create_connection((self.host, self.port), timeout=2)
+                new_socket.settimeout(None)
+                new_socket.send((json.dumps({
+                    'type': 'hello',
+                    'token': self.resume_token
+                }) + '\n').encode())
+            except OSError:
+                time.sleep(0.5)
+                continue
+            old_socket, self.socket = self.socket, new_socket
+            self.buffer = ''
+            old_socket.close()
+            return True
+        return False
+                
     def _draw_queue_status(self):
         """Draw the queue status message"""
         messages = []
@@ -159,6 +206,12 @@ class PongClient:
                               self.game_state['ball']['y'])
                 self._draw_scores()
                 
+                # Draw pause message while a player is reconnecting
+                if self.game_state.get('paused'):
+                    text = self.message_font.render("Waiting for a player to reconnect...", True, self.GRAY)
+                    text_rect = text.get_rect(center=(self.width//2, self.height//2 - 40))
+                    self.screen.blit(text, text_rect)
+                
                 # Draw winner message if game is over
                 if 'winner' in self.game_state and self.game_state['winner']:
                     winner_text = f"Player {self.game_state['winner'][-1]} Wins!"
@@ -192,9 +245,10 @@ class PongClient:
                 'type': 'move',
                 'movement': movement
             })
-            self.socket.send(message.encode())
+            self.socket.send((message + '\n').encode())
         except (BrokenPipeError, ConnectionResetError):
-            self.running = False
+            # The network thread notices the loss and tries to resume
+            pass
             
     def _draw_paddle(self, x, y):
         """Draw a paddle at the specified position"""
@@ -254,11 +308,16 @@ class PongClient:
         self.in_queue = False
         self.queue_position = 0
         self.game_id = None
+        self.resume_token = None
+        self.buffer = ''  # Unfinished line from the last recv
         
         # Network setup
+        self.host = host
+        self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.socket.connect((host, port))
+            self.socket.send((json.dumps({'type': 'hello'}) + '\n').encode())
             print("Connected to server")
         except ConnectionRefusedError:
             print("Could not connect to server")
@@ -283,9 +342,13 @@ class PongClient:
             try:
                 data = self.socket.recv(1024).decode()
                 if not data:
+                    if self._reconnect():
+                        continue
                     break
                     
-                messages = data.split('\n')
+                # Messages are newline delimited and may span or share reads
+                self.buffer += data
+                *messages, self.buffer = self.buffer.split('\n')
                 for message in messages:
                     if not message:
                         continue
@@ -296,11 +359,20 @@ class PongClient:
                         elif parsed['type'] == 'waiting':
                             self.in_queue = True
                             self.queue_position = parsed['position']
+                            # Only sent once the server has settled our hello,
+                            # so a token we still hold here is no longer valid
+                            self.resume_token = None
                             self.game_state['game_started'] = False
                         elif parsed['type'] == 'game_start':
                             self.in_queue = False
                             self.game_id = parsed['game_id']
+                            self.resume_token = parsed.get('resume_token')
                             self.game_state['game_started'] = True
+                        elif parsed['type'] == 'resumed':
+                            self.in_queue = False
+                            self.game_id = parsed['game_id']
+                            self.resume_token = parsed['resume_token']
+                            self.game_state = parsed['state']
                         elif parsed['type'] == 'error':
                             print("Server error:", parsed['message'])
                             self.running = False
@@ -308,11 +380,37 @@ class PongClient:
                     except json.JSONDecodeError:
                         print("Error parsing message:", message)
                         
-            except ConnectionResetError:
+            except (ConnectionResetError, OSError):
+                if self._reconnect():
+                    continue
                 print("Lost connection to server")
                 self.running = False
                 break
                 
+    def _reconnect(self):
+        """Reconnect and resume the current game, returns True on success"""
+        if not self.running or not self.resume_token:
+            return False
+            
+        print("Connection lost, trying to resume game...")
+        deadline = time.time() + self.RESUME_GRACE
+        while self.running and time.time() < deadline:
+            try:
+                new_socket = socket.create_connection((self.host, self.port), timeout=2)
+                new_socket.settimeout(None)
+                new_socket.send((json.dumps({
+                    'type': 'hello',
+                    'token': self.resume_token
+                }) + '\n').encode())
+            except OSError:
+                time.sleep(0.5)
+                continue
+            old_socket, self.socket = self.socket, new_socket
+            self.buffer = ''
+            old_socket.close()
+            return True
+        return False
+                
     def _draw_queue_status(self):
         """Draw the queue status message"""
         messages = []
@@ -368,6 +466,12 @@ class PongClient:
                               self.game_state['ball']['y'])
                 self._draw_scores()
                 
+                # Draw pause message while a player is reconnecting
+                if self.game_state.get('paused'):
+                    text = self.message_font.render("Waiting for a player to reconnect...", True, self.GRAY)
+                    text_rect = text.get_rect(center=(self.width//2, self.height//2 - 40))
+                    self.screen.blit(text, text_rect)
+                
             # Always draw game ID if available
             self._draw_game_id()
                 
@@ -388,9 +492,10 @@ class PongClient:
                 'type': 'move',
                 'movement': movement
             })
-            self.socket.send(message.encode())
+            self.socket.send((message + '\n').encode())
         except (BrokenPipeError, ConnectionResetError):
-            self.running = False
+            # The network thread notices the loss and tries to resume
+            pass
             
     def _draw_paddle(self, x, y):
         """Draw a paddle at the specified position"""
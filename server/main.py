@@ -1,9 +1,35 @@
+import argparse
+
+from server import bench
 from server.server import PongServer
 
 
 if __name__ == '__main__':
-    server = PongServer()
+    parser = argparse.ArgumentParser(description="Multiplayer pong server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--control-socket',
+                        help="Unix socket path used for zero-downtime restarts")
+    parser.add_argument('--takeover', action='store_true',
+                        help="Take over games and sockets from the server on --control-socket")
+    parser.add_argument('--bot-wait', type=float, default=5.0,
+                        help="Seconds a player waits before being matched against a bot")
+    parser.add_argument('--no-bots', action='store_true',
+                        help="Never match players against bots")
+    parser.add_argument('--bench', type=int, metavar='GAMES',
+                        help="Run GAMES headless bot-vs-bot games instead of serving")
+    parser.add_argument('--bench-ticks', type=int, default=600)
+    args = parser.parse_args()
+    if args.takeover and not args.control_socket:
+        parser.error("--takeover requires --control-socket")
+
+    if args.bench is not None:
+        bench.run(args.bench, args.bench_ticks)
+        raise SystemExit
+
+    server = PongServer(args.host, args.port, args.control_socket, args.takeover,
+                        None if args.no_bots else args.bot_wait)
     try:
         server.start()
     except KeyboardInterrupt:
-        print("\nShutting down server...")
\ No newline at end of file
+        print("\nShutting down server...")
@@ -0,0 +1,34 @@
+import time
+
+from server.game import BotController, PongGame
+
+
+def run(games=100, ticks=600):
+    """Tick bot-vs-bot games without any sockets and report throughput"""
+    pool = [_bot_game() for _ in range(games)]
+    finished = 0
+    
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for i, game in enumerate(pool):
+            game.tick()
+            if game.winner:
+                # Keep the load constant by replacing finished games
+                pool[i] = _bot_game()
+                finished += 1
+    elapsed = time.perf_counter() - start
+    rate = games * ticks / elapsed if elapsed else 0
+    per_frame = elapsed / ticks * 1000 if ticks else 0
+    
+    print(f"{games} games x {ticks} ticks in {elapsed:.3f}s: "
+          f"{rate:,.0f} game ticks/s, "
+          f"{per_frame:.3f} ms per frame, {finished} games finished")
+    return elapsed
+
+
+def _bot_game():
+    """Create a started game with a bot on both paddles"""
+    game = PongGame()
+    game.game_started = True
+    game.bots = {'player1': BotController(), 'player2': BotController()}
+    return game
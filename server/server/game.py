@@ -1,4 +1,6 @@
 import json
+import socket
+import time
 from uuid import uuid4
 
 
@@ -23,20 +25,28 @@ class PongGame:
             'dy': 5
         }
         self.game_started = False
+        self.paused = False  # Set while a player is disconnected
         self.winner = None  # Will store the winning player
+        self.bots = {}  # Role -> BotController for paddles without a player
         
     def update_paddle(self, player, movement):
         """Update paddle position with bounds checking"""
-        if self.winner:  # Don't allow movement if game is over
+        if self.winner or self.paused:  # Don't allow movement if game is over or paused
             return
             
         new_y = self.paddles[player]['y'] + movement
         if 0 <= new_y <= self.height - self.paddle_height:
             self.paddles[player]['y'] = new_y
             
+    def tick(self):
+        """Advance one frame, moving bot paddles before the ball"""
+        for role, bot in self.bots.items():
+            bot.move(self, role)
+        self.update_ball()
+            
     def update_ball(self):
         """Update ball position and handle collisions"""
-        if not self.game_started or self.winner:
+        if not self.game_started or self.paused or self.winner:
             return
             
         # Update position
@@ -87,87 +97,260 @@ class PongGame:
             'paddles': self.paddles,
             'ball': self.ball,
             'game_started': self.game_started,
+            'paused': self.paused,
             'winner': self.winner
         }
+
+    def to_dict(self):
+        """Return the full game state, including config, for a process handoff"""
+        return {
+            'paddle_height': self.paddle_height,
+            'paddle_width': self.paddle_width,
+            'ball_size': self.ball_size,
+            'width': self.width,
+            'height': self.height,
+            'WIN_SCORE': self.WIN_SCORE,
+            'paddles': self.paddles,
+            'ball': self.ball,
+            'game_started': self.game_started,
+            'paused': self.paused,
+            'winner': self.winner,
+            'bots': {role: bot.to_dict() for role, bot in self.bots.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a game from the output of to_dict"""
+        game = cls()
+        for key, value in data.items():
+            if key == 'bots':
+                value = {role: BotController(**bot) for role, bot in value.items()}
+            setattr(game, key, value)
+        return game
+
+
+class BotController:
+    """Cheap AI paddle that chases the ball, driven from PongGame.tick"""
+
+    def __init__(self, speed=4, dead_zone=8):
+        self.speed = speed          # Max movement per frame, below the ball speed
+        self.dead_zone = dead_zone  # Ignore offsets smaller than this to avoid jitter
+
+    def move(self, game, role):
+        """Move the paddle for role towards the ball, or back to the middle"""
+        ball = game.ball
+        incoming = ball['dx'] < 0 if role == 'player1' else ball['dx'] > 0
+        if incoming:
+            target = ball['y'] + game.ball_size // 2
+        else:
+            target = game.height // 2
+            
+        # Keep the target reachable, update_paddle rejects moves past the walls
+        paddle_y = game.paddles[role]['y']
+        target_y = min(max(target - game.paddle_height // 2, 0),
+                       game.height - game.paddle_height)
+        offset = target_y - paddle_y
+        if abs(offset) > self.dead_zone:
+            game.update_paddle(role, max(-self.speed, min(self.speed, offset)))
+
+    def to_dict(self):
+        """Return the bot settings for a process handoff"""
+        return {'speed': self.speed, 'dead_zone': self.dead_zone}
 import json
 from uuid import uuid4
 
 class GamePool:
-    def __init__(self):
+    RESUME_GRACE = 10  # Seconds a disconnected player has to resume their game
+
+    def __init__(self, bot_wait=5.0):
         self.waiting_players = []  # Players waiting to be matched
         self.active_games = {}     # Dictionary of active games
         self.player_to_game = {}   # Mapping of players to their current game
+        self.sessions = {}         # Resume token -> (game_id, role)
+        self.waiting_since = {}    # Waiting player -> time they joined the queue
+        self.bot_seats = {}        # Game ID -> role played by a bot, oldest first
+        self.bot_wait = bot_wait   # Seconds before a bot backfills, None disables bots
         
     def add_player(self, player_id, client_socket):
         """Add a new player to the pool system"""
         if len(self.waiting_players) > 0:
             # Match with waiting player
             opponent = self.waiting_players.pop(0)
-            game_id = str(uuid4())  # Generate unique UUID for game
+            del self.waiting_since[opponent]
+            game_id = self._create_game(opponent, client_socket)
             
-            # Create new game instance
-            game = PongGame()
-            game.game_started = True
+            # Notify both players they've been matched
+            self._notify_players_matched(game_id)
             
-            # Store game and player mappings
-            self.active_games[game_id] = {
-                'game': game,
-                'players': {
-                    'player1': opponent,
-                    'player2': client_socket
-                }
-            }
+            return game_id
+        
+        # Take over a bot's paddle in a running game
+        for game_id, role in self.bot_seats.items():
+            game_info = self.active_games[game_id]
+            if not game_info['game'].paused and not game_info['game'].winner:
+                del self.bot_seats[game_id]
+                del game_info['game'].bots[role]
+                self._seat_player(game_id, role, client_socket)
+                self._notify_player_matched(game_id, role)
+                return game_id
+                
+        # Add to waiting list
+        self._enqueue(client_socket)
+        return None
             
-            # Map both players to this game
-            self.player_to_game[opponent] = game_id
-            self.player_to_game[client_socket] = game_id
+    def join_player(self, client_socket, token=None):
+        """Admit a new connection, resuming its game if the token is still valid"""
+        if token and self.resume_player(token, client_socket):
+            return
+        self.add_player(None, client_socket)
             
-            # Notify both players they've been matched
+    def backfill_bots(self, now=None):
+        """Match players who waited longer than bot_wait against a bot"""
+        if self.bot_wait is None:
+            return
+        now = time.monotonic() if now is None else now
+        
+        # The queue is in join order, so stop at the first player still in time
+        while self.waiting_players:
+            player = self.waiting_players[0]
+            if now - self.waiting_since[player] < self.bot_wait:
+                break
+            self.waiting_players.pop(0)
+            del self.waiting_since[player]
+            
+            game_id = self._create_game(player, None)
+            self.active_games[game_id]['game'].bots['player2'] = BotController()
+            self.bot_seats[game_id] = 'player2'
             self._notify_players_matched(game_id)
             
-            return game_id
-        else:
-            # Add to waiting list
-            self.waiting_players.append(client_socket)
-            self._notify_player_waiting(client_socket)
-            return None
+    def _create_game(self, player1, player2):
+        """Start a game between two players, either may be None for a bot seat"""
+        game_id = str(uuid4())  # Generate unique UUID for game
+        
+        # Create new game instance
+        game = PongGame()
+        game.game_started = True
+        
+        # Store game and player mappings
+        self.active_games[game_id] = {
+            'game': game,
+            'players': {
+                'player1': None,
+                'player2': None
+            },
+            'tokens': {},        # Role -> resume token
+            'disconnected': {}   # Role -> deadline to resume by
+        }
+        for role, player in (('player1', player1), ('player2', player2)):
+            if player is not None:
+                self._seat_player(game_id, role, player)
+        return game_id
+        
+    def _seat_player(self, game_id, role, client_socket):
+        """Put a player in a game seat and issue their resume token"""
+        game_info = self.active_games[game_id]
+        token = str(uuid4())
+        game_info['players'][role] = client_socket
+        game_info['tokens'][role] = token
+        self.sessions[token] = (game_id, role)
+        self.player_to_game[client_socket] = game_id
+        
+    def _enqueue(self, client_socket, since=None):
+        """Append a player to the waiting list"""
+        self.waiting_players.append(client_socket)
+        self.waiting_since[client_socket] = time.monotonic() if since is None else since
+        self._notify_player_waiting(client_socket)
             
     def remove_player(self, client_socket):
         """Remove a player from the pool system"""
         # Remove from waiting list if present
         if client_socket in self.waiting_players:
             self.waiting_players.remove(client_socket)
+            del self.waiting_since[client_socket]
             return
             
         # Handle removal from active game
         if client_socket in self.player_to_game:
-            game_id = self.player_to_game[client_socket]
+            game_id = self.player_to_game.pop(client_socket)
             if game_id in self.active_games:  # Check if game still exists
                 game_info = self.active_games[game_id]
                 
-                # Notify other player about disconnection
-                other_player = None
+                # Free the seat so the leaving socket is never re-queued
+                seat = None
                 for role, player in game_info['players'].items():
-                    if player != client_socket:
-                        other_player = player
-                        break
+                    if player == client_socket:
+                        seat = role
+                        game_info['players'][role] = None
                         
-                if other_player:
-                    # Remove game mappings
-                    if client_socket in self.player_to_game:
-                        del self.player_to_game[client_socket]
-                    if other_player in self.player_to_game:
-                        del self.player_to_game[other_player]
-                    
-                    # Add other player back to waiting list
-                    self.waiting_players.append(other_player)
-                    self._notify_player_waiting(other_player)
+                if game_info['game'].winner:
+                    # Nothing left to resume
+                    self._end_game(game_id)
+                    return
                     
-                # Remove the game
-                del self.active_games[game_id]
-            else:
-                # Clean up orphaned player mapping
-                del self.player_to_game[client_socket]
+                # Pause the game and keep the seat open for a resume
+                if seat is not None:
+                    game_info['disconnected'][seat] = time.monotonic() + self.RESUME_GRACE
+                game_info['game'].paused = True
+
+    def resume_player(self, token, client_socket):
+        """Reattach a reconnected player to their paused game"""
+        if token not in self.sessions:
+            return False
+        game_id, role = self.sessions[token]
+        game_info = self.active_games.get(game_id)
+        if game_info is None:
+            return False
+            
+        # The client may notice a dead link before the server does, so the
+        # token wins over a stale socket still sitting in the seat
+        stale = game_info['players'][role]
+        if stale is not None and stale != client_socket:
+            self.player_to_game.pop(stale, None)
+            try:
+                # Wakes the stale handler, which closes the socket
+                stale.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+                
+        game_info['players'][role] = client_socket
+        game_info['disconnected'].pop(role, None)
+        self.player_to_game[client_socket] = game_id
+        if not game_info['disconnected']:
+            game_info['game'].paused = False
+            
+        # Send the current snapshot right away so the client can redraw
+        try:
+            client_socket.send((json.dumps({
+                'type': 'resumed',
+                'game_id': game_id,
+                'role': role,
+                'resume_token': token,
+                'state': game_info['game'].get_state()
+            }) + '\n').encode())
+        except (BrokenPipeError, ConnectionResetError):
+            self.remove_player(client_socket)
+        return True
+
+    def expire_sessions(self, now=None):
+        """End games whose disconnected players did not resume in time"""
+        now = time.monotonic() if now is None else now
+        for game_id, game_info in list(self.active_games.items()):
+            if any(deadline <= now for deadline in game_info['disconnected'].values()):
+                self._end_game(game_id)
+
+    def _end_game(self, game_id):
+        """Delete a game and send any connected player back to the waiting list"""
+        game_info = self.active_games.pop(game_id)
+        self.bot_seats.pop(game_id, None)
+        for token in game_info['tokens'].values():
+            self.sessions.pop(token, None)
+            
+        for player in game_info['players'].values():
+            if player is not None:
+                self.player_to_game.pop(player, None)
+                
+                # Add player back to waiting list
+                self._enqueue(player)
 
     def get_game_for_player(self, client_socket):
         """Get the current game instance for a player"""
@@ -186,28 +369,97 @@ class GamePool:
                 return 'player1' if players['player1'] == client_socket else 'player2'
         return None
 
+    def export_state(self, sock_index):
+        """Serialize pool state, replacing sockets with sock_index(socket)"""
+        now = time.monotonic()
+        return {
+            'waiting_players': [sock_index(s) for s in self.waiting_players],
+            # Time already spent in the queue, in seconds
+            'waited': [now - self.waiting_since[s] for s in self.waiting_players],
+            'active_games': {
+                game_id: {
+                    'game': game_info['game'].to_dict(),
+                    'players': {
+                        role: sock_index(player) if player is not None else None
+                        for role, player in game_info['players'].items()
+                    },
+                    'tokens': game_info['tokens'],
+                    # Deadlines are stored as remaining seconds
+                    'disconnected': {
+                        role: deadline - now
+                        for role, deadline in game_info['disconnected'].items()
+                    }
+                }
+                for game_id, game_info in self.active_games.items()
+            }
+        }
+
+    def restore_state(self, state, sockets):
+        """Load state produced by export_state, resolving indexes into sockets"""
+        now = time.monotonic()
+        self.waiting_players = [sockets[i] for i in state['waiting_players']]
+        # Builds without bot backfill do not send queue times, start them now
+        waited = state.get('waited') or [0] * len(self.waiting_players)
+        self.waiting_since = {
+            player: now - seconds
+            for player, seconds in zip(self.waiting_players, waited)
+        }
+        self.active_games = {}
+        self.player_to_game = {}
+        self.sessions = {}
+        self.bot_seats = {}
+        for game_id, game_info in state['active_games'].items():
+            players = {
+                role: sockets[i] if i is not None else None
+                for role, i in game_info['players'].items()
+            }
+            self.active_games[game_id] = {
+                'game': PongGame.from_dict(game_info['game']),
+                'players': players,
+                # Builds without resumable sessions do not send these
+                'tokens': game_info.get('tokens', {}),
+                'disconnected': {
+                    role: now + remaining
+                    for role, remaining in game_info.get('disconnected', {}).items()
+                }
+            }
+            for player in players.values():
+                if player is not None:
+                    self.player_to_game[player] = game_id
+            for role, token in self.active_games[game_id]['tokens'].items():
+                self.sessions[token] = (game_id, role)
+            for role in self.active_games[game_id]['game'].bots:
+                self.bot_seats[game_id] = role
+
     def _notify_players_matched(self, game_id):
         """Notify players they've been matched"""
         if game_id in self.active_games:  # Check if game still exists
-            game_info = self.active_games[game_id]
-            message = json.dumps({
-                'type': 'game_start',
-                'game_id': game_id
-            }).encode()
-            
-            for player_socket in game_info['players'].values():
-                try:
-                    player_socket.send(message)
-                except (BrokenPipeError, ConnectionResetError):
-                    self.remove_player(player_socket)
+            for role, player_socket in list(self.active_games[game_id]['players'].items()):
+                if player_socket is not None:
+                    self._notify_player_matched(game_id, role)
+
+    def _notify_player_matched(self, game_id, role):
+        """Send game_start with the resume token to the player in role"""
+        game_info = self.active_games[game_id]
+        player_socket = game_info['players'][role]
+        message = (json.dumps({
+            'type': 'game_start',
+            'game_id': game_id,
+            'role': role,
+            'resume_token': game_info['tokens'][role]
+        }) + '\n').encode()
+        try:
+            player_socket.send(message)
+        except (BrokenPipeError, ConnectionResetError):
+            self.remove_player(player_socket)
 
     def _notify_player_waiting(self, client_socket):
         """Notify player they're in the waiting list"""
         try:
-            message = json.dumps({
+            message = (json.dumps({
                 'type': 'waiting',
                 'position': self.waiting_players.index(client_socket)
-            }).encode()
+            }) + '\n').encode()
             client_socket.send(message)
         except (BrokenPipeError, ConnectionResetError):
             self.remove_player(client_socket)
@@ -0,0 +1,109 @@
+import json
+import socket
+import struct
+
+
+# Header sent before the fds: (length of JSON state, number of fds)
+HEADER = struct.Struct('!II')
+# Linux caps SCM_RIGHTS at 253 fds per message, stay well below it
+MAX_FDS_PER_MESSAGE = 200
+
+
+class HandoffError(Exception):
+    """Raised when the state handoff between two server processes fails"""
+
+
+def send_state(conn, server_socket, pool, clients):
+    """Send the listening socket, client sockets and pool state over conn
+
+    clients maps each client socket to its server-side state, including the
+    unfinished line in its read buffer.
+
+    The caller must hold the server lock so the pool cannot change while it
+    is being serialized. Returns once the successor has acknowledged.
+    """
+    sockets = [server_socket]
+    index = {}
+
+    def sock_index(sock):
+        if sock not in index:
+            index[sock] = len(sockets)
+            sockets.append(sock)
+        return index[sock]
+
+    state = pool.export_state(sock_index)
+    state['clients'] = [
+        # latin-1 round-trips arbitrary bytes through JSON
+        {
+            'socket': sock_index(sock),
+            'buffer': client['buffer'].decode('latin-1'),
+            'greeted': client['greeted']
+        }
+        for sock, client in clients.items()
+    ]
+    state = json.dumps(state).encode()
+    fds = [sock.fileno() for sock in sockets]
+
+    conn.sendall(HEADER.pack(len(state), len(fds)))
+    for start in range(0, len(fds), MAX_FDS_PER_MESSAGE):
+        socket.send_fds(conn, [b'F'], fds[start:start + MAX_FDS_PER_MESSAGE])
+    conn.sendall(state)
+
+    if _recv_exact(conn, 2) != b'OK':
+        raise HandoffError("Successor did not acknowledge the handoff")
+
+
+def receive_state(path, pool, clients):
+    """Take over a running server listening for a handoff on path
+
+    Restores the pool and the clients mapping in place and returns
+    (server_socket, client_sockets) once the old process has exited.
+    """
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+        conn.sendall(b'handoff\n')
+
+        state_length, fd_count = HEADER.unpack(_recv_exact(conn, HEADER.size))
+        fds = []
+        while len(fds) < fd_count:
+            wanted = min(MAX_FDS_PER_MESSAGE, fd_count - len(fds))
+            data, received, flags, _ = socket.recv_fds(conn, 1, wanted)
+            if data != b'F' or flags & socket.MSG_CTRUNC:
+                raise HandoffError("Truncated socket transfer")
+            fds.extend(received)
+
+        state = json.loads(_recv_exact(conn, state_length).decode())
+        sockets = [socket.socket(fileno=fd) for fd in fds]
+        pool.restore_state(state, sockets)
+        # Builds without framed reads send no client state, and every
+        # client they hand over is already in the pool
+        for sock in sockets[1:]:
+            clients[sock] = {'buffer': b'', 'greeted': True}
+        for client in state.get('clients', []):
+            clients[sockets[client['socket']]] = {
+                'buffer': client['buffer'].encode('latin-1'),
+                'greeted': client.get('greeted', True)
+            }
+
+        conn.sendall(b'OK')
+
+        # The old process exits after the ack. Wait for that before serving
+        # anything, so no client bytes are read by both processes.
+        while conn.recv(64):
+            pass
+    finally:
+        conn.close()
+
+    return sockets[0], sockets[1:]
+
+
+def _recv_exact(conn, size):
+    """Read exactly size bytes from conn"""
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise HandoffError("Connection closed during handoff")
+        data += chunk
+    return data
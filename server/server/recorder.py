@@ -0,0 +1,178 @@
+import gc
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class FlightRecorder:
+    """Ring buffer of per-tick timings for the server game loop"""
+
+    PHASES = ('lock_wait', 'matchmaking', 'physics', 'serialize', 'send')
+
+    def __init__(self, size=600, outlier_ms=2.0):
+        self.ticks = deque(maxlen=size)       # Last `size` tick records
+        self.gc_pauses = deque(maxlen=size)   # (time, generation, seconds)
+        self.outlier = outlier_ms / 1000      # Per-game cost worth recording
+        self.profiler = SamplingProfiler()
+
+        self._tick_count = 0
+        self._current = None
+        self._last_mark = 0.0
+        self._gc_start = None
+        gc.callbacks.append(self._on_gc)
+
+    def begin_tick(self):
+        """Start recording a new tick"""
+        self._tick_count += 1
+        self._last_mark = time.perf_counter()
+        self._current = {
+            'tick': self._tick_count,
+            'time': time.time(),
+            'start': self._last_mark,
+            'phases': dict.fromkeys(self.PHASES, 0.0),
+            'games': 0,
+            'slow_games': [],
+            'gc': 0.0
+        }
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to phase"""
+        now = time.perf_counter()
+        self._current['phases'][phase] += now - self._last_mark
+        self._last_mark = now
+        return now
+
+    def record_game(self, game_id, started):
+        """Record the cost of one game if it is an outlier"""
+        self._current['games'] += 1
+        cost = self._last_mark - started
+        if cost >= self.outlier:
+            self._current['slow_games'].append((game_id, cost))
+
+    def end_tick(self):
+        """Finish the current tick and push it into the ring buffer"""
+        tick = self._current
+        tick['total'] = time.perf_counter() - tick['start']
+        self.ticks.append(tick)
+        self._current = None
+
+    def _on_gc(self, phase, info):
+        """gc callback measuring collection pauses"""
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            pause = time.perf_counter() - self._gc_start
+            self._gc_start = None
+            self.gc_pauses.append((time.time(), info['generation'], pause))
+            tick = self._current
+            if tick is not None:
+                tick['gc'] += pause
+
+    def dump(self, slowest=10):
+        """Return a text report of the recorded ticks"""
+        ticks = _snapshot(self.ticks)
+        lines = [f"Flight recorder: {len(ticks)} ticks"]
+        if ticks:
+            header = f"{'':>10}{'total':>10}" + ''.join(f"{p:>13}" for p in self.PHASES)
+            lines.append(header + f"{'gc':>9}")
+            for name, pick in (('avg', lambda v: sum(v) / len(v)), ('max', max)):
+                row = f"{name:>10}{pick([t['total'] for t in ticks]) * 1000:>10.3f}"
+                row += ''.join(f"{pick([t['phases'][p] for t in ticks]) * 1000:>13.3f}"
+                               for p in self.PHASES)
+                row += f"{pick([t['gc'] for t in ticks]) * 1000:>9.3f}"
+                lines.append(row)
+
+            lines.append(f"Slowest {slowest} ticks (ms):")
+            for tick in sorted(ticks, key=lambda t: t['total'], reverse=True)[:slowest]:
+                phases = ' '.join(f"{p}={tick['phases'][p] * 1000:.3f}" for p in self.PHASES)
+                lines.append(f"  #{tick['tick']} at {time.strftime('%H:%M:%S', time.localtime(tick['time']))} "
+                             f"total={tick['total'] * 1000:.3f} {phases} gc={tick['gc'] * 1000:.3f} "
+                             f"games={tick['games']}")
+                for game_id, cost in tick['slow_games']:
+                    lines.append(f"    game {game_id}: {cost * 1000:.3f}")
+
+        pauses = _snapshot(self.gc_pauses)
+        if pauses:
+            lines.append(f"GC pauses: {len(pauses)}, longest (ms):")
+            for when, generation, pause in sorted(pauses, key=lambda p: p[2], reverse=True)[:slowest]:
+                lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(when))} "
+                             f"gen{generation} {pause * 1000:.3f}")
+
+        lines.append(self.profiler.dump())
+        return '\n'.join(lines) + '\n'
+
+
+def _snapshot(buffer):
+    """Copy a deque that another thread or a gc callback may be appending to"""
+    while True:
+        try:
+            return list(buffer)
+        except RuntimeError:
+            continue
+
+
+class SamplingProfiler:
+    """Periodically samples the stack of a thread while enabled"""
+
+    def __init__(self, interval=0.005, max_depth=20):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.target = None  # Thread ident to sample, all threads if None
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Start sampling, discarding previous results"""
+        if self._running:
+            return
+        self.samples = Counter()
+        self._running = True
+        self._thread = threading.Thread(target=self._sample_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, keeping the collected samples"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def toggle(self):
+        """Flip between running and stopped, returning the new state"""
+        if self._running:
+            self.stop()
+        else:
+            self.start()
+        return self._running
+
+    def _sample_loop(self):
+        """Collect folded stacks until stopped"""
+        own = threading.get_ident()
+        while self._running:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.target is not None and ident != self.target):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump(self, top=15):
+        """Return the most sampled stacks as text"""
+        state = 'running' if self._running else 'stopped'
+        samples = self.samples.copy()
+        total = sum(samples.values())
+        lines = [f"Profiler {state}, {total} samples"]
+        for stack, count in samples.most_common(top):
+            lines.append(f"  {count * 100 / total:5.1f}% {stack}")
+        return '\n'.join(lines)
@@ -1,21 +1,44 @@
 import json
+import os
+import selectors
+import signal
 import socket
+import sys
 import threading
 import time
 
+from server import handoff
 from server.game import GamePool
+from server.recorder import FlightRecorder
 
 
 class PongServer:
-    def __init__(self, host='0.0.0.0', port=5000):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((host, port))
-        self.server_socket.listen(10)  # Increased backlog for multiple connections
-        
-        self.pool = GamePool()
+    def __init__(self, host='0.0.0.0', port=5000, control_path=None, takeover=False,
+                 bot_wait=5.0):
+        self.pool = GamePool(bot_wait)
         self.lock = threading.Lock()
+        self.control_path = control_path
+        self.inherited_clients = []
+        # Client socket -> {'buffer': bytes of an unfinished line,
+        #                  'greeted': whether its hello was handled}
+        self.clients = {}
+        self.recorder = FlightRecorder()
+        self.profiler_toggle = False  # Set by SIGUSR2, handled by the game loop
+        
+        if takeover:
+            # Adopt the sockets and games of the process listening on control_path
+            self.server_socket, self.inherited_clients = handoff.receive_state(
+                control_path, self.pool, self.clients)
+            print(f"Took over {len(self.pool.active_games)} games and "
+                  f"{len(self.inherited_clients)} clients")
+        else:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((host, port))
+            self.server_socket.listen(10)  # Increased backlog for multiple connections
         
+        # After a takeover the inherited socket, not the arguments, has the address
+        host, port = self.server_socket.getsockname()[:2]
         print(f"Server started on {host}:{port}")
         
     def start(self):
@@ -24,53 +47,116 @@ class PongServer:
         update_thread = threading.Thread(target=self._game_loop)
         update_thread.daemon = True
         update_thread.start()
+        self.recorder.profiler.target = update_thread.ident
+        
+        # SIGUSR1 dumps the flight recorder, SIGUSR2 toggles the profiler
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self._dump_recorder())
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self._request_profiler_toggle())
         
-        # Accept client connections
+        # Listen for a successor process asking for a handoff
+        if self.control_path:
+            control_thread = threading.Thread(target=self._control_loop)
+            control_thread.daemon = True
+            control_thread.start()
+        
+        # Resume serving clients handed over by the previous process
+        for client_socket in self.inherited_clients:
+            self._start_handler(client_socket)
+        self.inherited_clients = []
+        
+        # Accept client connections. Accepting and registering the client
+        # happen under the lock, so a handoff never misses an accepted socket.
+        # The client joins the pool once its hello says whether it is resuming.
+        self.server_socket.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(self.server_socket, selectors.EVENT_READ)
         while True:
-            client_socket, address = self.server_socket.accept()
+            selector.select()
+            with self.lock:
+                try:
+                    client_socket, address = self.server_socket.accept()
+                except BlockingIOError:
+                    continue
+                client_socket.setblocking(True)
+                self.clients[client_socket] = {'buffer': b'', 'greeted': False}
             print(f"Client connected from {address}")
+            self._start_handler(client_socket)
             
-            # Start client handler thread
-            client_thread = threading.Thread(target=self._handle_client, args=(client_socket,))
-            client_thread.daemon = True
-            client_thread.start()
+    def _start_handler(self, client_socket):
+        """Start client handler thread"""
+        client_thread = threading.Thread(target=self._handle_client, args=(client_socket,))
+        client_thread.daemon = True
+        client_thread.start()
             
     def _handle_client(self, client_socket):
         """Handle individual client connection"""
+        selector = selectors.DefaultSelector()
+        selector.register(client_socket, selectors.EVENT_READ)
         try:
-            # Add player to pool
-            with self.lock:
-                self.pool.add_player(None, client_socket)
-            
             while True:
-                data = client_socket.recv(1024).decode()
-                if not data:
-                    break
-                    
-                message = json.loads(data)
-                
+                # Only read under the lock, so a frozen process consumes nothing
+                # its successor should see
+                selector.select()
                 with self.lock:
-                    game = self.pool.get_game_for_player(client_socket)
-                    if game and message['type'] == 'move':
-                        player_role = self.pool.get_player_role(client_socket)
-                        game.update_paddle(player_role, message['movement'])
+                    data = client_socket.recv(1024)
+                    if not data:
+                        break
+                        
+                    # Messages are newline delimited and may span or share reads
+                    client = self.clients[client_socket]
+                    *lines, client['buffer'] = (client['buffer'] + data).split(b'\n')
+                    for line in lines:
+                        if line.strip():
+                            self._handle_message(client_socket, client, json.loads(line))
                         
         except (ConnectionResetError, json.JSONDecodeError):
             pass
         finally:
             # Clean up disconnected client
             with self.lock:
+                self.clients.pop(client_socket, None)
                 self.pool.remove_player(client_socket)
             client_socket.close()
+            selector.close()
+            
+    def _handle_message(self, client_socket, client, message):
+        """Apply one client message, called with the lock held"""
+        # The first message is a hello, carrying a resume token on reconnects
+        if not client['greeted']:
+            client['greeted'] = True
+            self.pool.join_player(client_socket, message.get('token'))
+            if message['type'] == 'hello':
+                return
+            
+        game = self.pool.get_game_for_player(client_socket)
+        if game and message['type'] == 'move':
+            player_role = self.pool.get_player_role(client_socket)
+            game.update_paddle(player_role, message['movement'])
             
     def _game_loop(self):
         """Main game update loop"""
+        recorder = self.recorder
         while True:
+            if self.profiler_toggle:
+                self.profiler_toggle = False
+                self._toggle_profiler()
+                
+            recorder.begin_tick()
             with self.lock:
+                recorder.mark('lock_wait')
+                # Drop games whose players did not come back in time
+                self.pool.expire_sessions()
+                # Give players who waited too long a bot opponent
+                self.pool.backfill_bots()
+                recorder.mark('matchmaking')
+                
                 # Update all active games
-                for game_info in self.pool.active_games.values():
+                for game_id, game_info in list(self.pool.active_games.items()):
+                    game_start = time.perf_counter()
                     game = game_info['game']
-                    game.update_ball()
+                    game.tick()
+                    recorder.mark('physics')
                     
                     # Broadcast state to both players
                     state_message = {
@@ -78,11 +164,81 @@ class PongServer:
                         'state': game.get_state()
                     }
                     
-                    data = json.dumps(state_message).encode()
-                    for player_socket in game_info['players'].values():
+                    data = (json.dumps(state_message) + '\n').encode()
+                    recorder.mark('serialize')
+                    for player_socket in list(game_info['players'].values()):
+                        if player_socket is None:
+                            continue
                         try:
                             player_socket.send(data)
                         except (BrokenPipeError, ConnectionResetError):
                             self.pool.remove_player(player_socket)
+                    recorder.mark('send')
+                    recorder.record_game(game_id, game_start)
                             
-            time.sleep(1/60)  # 60 FPS
\ No newline at end of file
+            recorder.end_tick()
+            time.sleep(1/60)  # 60 FPS
+
+    def _control_loop(self):
+        """Accept commands on the Unix control socket"""
+        if os.path.exists(self.control_path):
+            os.unlink(self.control_path)
+        control_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        control_socket.bind(self.control_path)
+        control_socket.listen(1)
+        
+        while True:
+            conn, _ = control_socket.accept()
+            try:
+                self._handle_control(conn)
+            except (OSError, handoff.HandoffError) as e:
+                print(f"Control command failed: {e}")
+            finally:
+                conn.close()
+                
+    def _handle_control(self, conn):
+        """Run a single control command"""
+        command = conn.recv(64).decode().strip()
+        if command == 'handoff':
+            # Holding the lock freezes the game loop, the accept loop and every
+            # client read until this process exits, so nothing runs twice
+            self.lock.acquire()
+            try:
+                handoff.send_state(conn, self.server_socket, self.pool, self.clients)
+            except BaseException:
+                self.lock.release()
+                raise
+            print("Handed off to new server process, exiting")
+            # os._exit skips flushing, which would drop buffered log output
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Skip cleanup: closing sockets here must not disturb the successor
+            os._exit(0)
+        elif command == 'dump':
+            conn.sendall(self.recorder.dump().encode())
+        elif command in ('profile on', 'profile off'):
+            profiler = self.recorder.profiler
+            if command == 'profile on':
+                profiler.start()
+            else:
+                profiler.stop()
+            conn.sendall(f"profiler {'running' if profiler.running else 'stopped'}\n".encode())
+        else:
+            conn.sendall(f"unknown command: {command}\n".encode())
+            
+    def _dump_recorder(self):
+        """Write the flight recorder report to stderr"""
+        # Runs in a signal handler, so bypass the buffered sys.stderr which the
+        # interrupted code may be in the middle of using
+        data = self.recorder.dump().encode()
+        while data:
+            data = data[os.write(2, data):]
+        
+    def _request_profiler_toggle(self):
+        """Ask the game loop to toggle the profiler, safe in a signal handler"""
+        self.profiler_toggle = True
+        
+    def _toggle_profiler(self):
+        """Turn the sampling profiler on or off"""
+        running = self.recorder.profiler.toggle()
+        print(f"Profiler {'started' if running else 'stopped'}")